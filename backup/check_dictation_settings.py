@@ -6,6 +6,56 @@ macOS音声入力設定確認ツール
 import subprocess
 import sys
 
+# 設定値はCFPreferencesで直接読む（defaultsコマンドを起動しない）
+try:
+    from CoreFoundation import (
+        CFPreferencesCopyAppValue, CFPreferencesCopyKeyList,
+        kCFPreferencesCurrentUser, kCFPreferencesAnyHost
+    )
+    CFPREFERENCES_AVAILABLE = True
+except ImportError:
+    CFPREFERENCES_AVAILABLE = False
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# 音声入力関連プロセス名
+DICTATION_PROCESSES = (
+    'DictationIM', 'SpeechRecognitionServer', 'AppleSpell',
+    'TextInputMenuAgent', 'com.apple.inputmethod'
+)
+
+HITOOLBOX_DOMAIN = 'com.apple.HIToolbox'
+
+def read_hitoolbox_value(key):
+    """com.apple.HIToolboxの設定値を文字列で取得（未設定ならNone）"""
+    if CFPREFERENCES_AVAILABLE:
+        value = CFPreferencesCopyAppValue(key, HITOOLBOX_DOMAIN)
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        return str(value)
+    
+    result = subprocess.run([
+        'defaults', 'read', HITOOLBOX_DOMAIN, key
+    ], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def hitoolbox_has_key(name):
+    """com.apple.HIToolboxにnameを含むキーがあるか"""
+    if CFPREFERENCES_AVAILABLE:
+        keys = CFPreferencesCopyKeyList(HITOOLBOX_DOMAIN, kCFPreferencesCurrentUser, kCFPreferencesAnyHost) or ()
+        return any(name in key for key in keys)
+    
+    result = subprocess.run([
+        'defaults', 'read', HITOOLBOX_DOMAIN
+    ], capture_output=True, text=True)
+    return name in result.stdout
+
 def check_dictation_settings():
     """macOSの音声入力設定を確認"""
     print("🔍 macOS音声入力設定確認")
@@ -14,12 +64,9 @@ def check_dictation_settings():
     # 音声入力の有効状態を確認
     try:
         print("📋 システム音声入力設定確認中...")
-        result = subprocess.run([
-            'defaults', 'read', 'com.apple.HIToolbox', 'AppleDictationAutoEnable'
-        ], capture_output=True, text=True)
+        setting = read_hitoolbox_value('AppleDictationAutoEnable')
         
-        if result.returncode == 0:
-            setting = result.stdout.strip()
+        if setting is not None:
             if setting == "1":
                 print("✅ 音声入力が有効になっています")
             else:
@@ -34,11 +81,7 @@ def check_dictation_settings():
     # ショートカットキー設定を確認
     print("\n📋 音声入力ショートカット設定確認中...")
     try:
-        result = subprocess.run([
-            'defaults', 'read', 'com.apple.HIToolbox'
-        ], capture_output=True, text=True)
-        
-        if "DictationHotKey" in result.stdout:
+        if hitoolbox_has_key("DictationHotKey"):
             print("✅ 音声入力ショートカットが設定されています")
         else:
             print("⚠️ 音声入力ショートカットが設定されていない可能性があります")
@@ -49,16 +92,17 @@ def check_dictation_settings():
     # 現在実行中の音声入力関連プロセスを確認
     print("\n📋 音声入力関連プロセス確認中...")
     try:
-        result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
-        dictation_processes = [
-            'DictationIM', 'SpeechRecognitionServer', 'AppleSpell', 
-            'TextInputMenuAgent', 'com.apple.inputmethod'
-        ]
+        if PSUTIL_AVAILABLE:
+            # ps を起動せず、ps aux と同様にコマンドライン全体を対象にする
+            # （プロセス名は15文字で切り詰められることがあり、バンドルIDも含まない）
+            running = "\n".join(
+                " ".join(p.info['cmdline'] or ()) or p.info['exe'] or p.info['name'] or ''
+                for p in psutil.process_iter(['name', 'exe', 'cmdline'])
+            )
+        else:
+            running = subprocess.run(['ps', 'aux'], capture_output=True, text=True).stdout
         
-        found_processes = []
-        for process in dictation_processes:
-            if process in result.stdout:
-                found_processes.append(process)
+        found_processes = [process for process in DICTATION_PROCESSES if process in running]
         
         if found_processes:
             print(f"✅ 検出されたプロセス: {', '.join(found_processes)}")
@@ -81,12 +125,9 @@ def check_keyboard_layout():
     print("="*30)
     
     try:
-        result = subprocess.run([
-            'defaults', 'read', 'com.apple.HIToolbox', 'AppleCurrentKeyboardLayoutInputSourceID'
-        ], capture_output=True, text=True)
+        layout = read_hitoolbox_value('AppleCurrentKeyboardLayoutInputSourceID')
         
-        if result.returncode == 0:
-            layout = result.stdout.strip()
+        if layout is not None:
             print(f"📋 現在のキーボード配列: {layout}")
             
             if "Japanese" in layout or "JIS" in layout:
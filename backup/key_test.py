@@ -4,6 +4,7 @@
 メインファイルのキー操作関数とQuartzテストの両方を実行
 """
 
+import importlib.util
 import subprocess
 import time
 import sys
@@ -17,19 +18,14 @@ except ImportError:
     QUARTZ_AVAILABLE = False
 
 def press_key_quartz(keycode: int) -> bool:
-    """Quartzを使用してキーを送信"""
+    """Quartzを使用してキーを送信（down/upを連続送信するタップ）"""
     if not QUARTZ_AVAILABLE:
         return False
     
     try:
-        # Key down
-        event = CGEventCreateKeyboardEvent(None, keycode, True)
-        CGEventPost(kCGHIDEventTap, event)
-        time.sleep(0.05)
-        
-        # Key up
-        event = CGEventCreateKeyboardEvent(None, keycode, False)
-        CGEventPost(kCGHIDEventTap, event)
+        # 音声入力ショートカットはエッジ検出のため押下保持の待機は不要
+        CGEventPost(kCGHIDEventTap, CGEventCreateKeyboardEvent(None, keycode, True))
+        CGEventPost(kCGHIDEventTap, CGEventCreateKeyboardEvent(None, keycode, False))
         
         return True
     except Exception as e:
@@ -59,7 +55,7 @@ def quartz_test():
             print("❌ 1回目の右コマンドキー送信失敗")
             return False, False
         
-        time.sleep(0.3)
+        time.sleep(0.15)
         
         # 2回目
         if not press_key_quartz(RIGHT_COMMAND_KEY):
@@ -104,12 +100,8 @@ try:
 except ImportError:
     MAIN_MODULE_AVAILABLE = False
 
-# 音声入力用のWhisperインポート
-try:
-    from faster_whisper import WhisperModel
-    WHISPER_AVAILABLE = True
-except ImportError:
-    WHISPER_AVAILABLE = False
+# 音声入力用のWhisper有無確認（モジュール本体は読み込まない）
+WHISPER_AVAILABLE = importlib.util.find_spec("faster_whisper") is not None
 
 def main_module_test():
     """メインファイルのキー操作関数テスト"""
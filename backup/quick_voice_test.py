@@ -7,8 +7,17 @@
 import subprocess
 import tempfile
 import os
+import re
 from faster_whisper import WhisperModel
 
+# 「はい」判定の語彙（1本の正規表現にまとめて1回の走査で判定する）
+YES_COMMANDS = (
+    'はい', 'hai', 'yes', 'うん', 'そうです', 'オッケー', 'ok', 'そう', 'テスト',
+    'お願い', 'します', 'いたします', 'ください', '続行', '開始',
+    'よろしく', 'いいよ', 'いいです', 'ありがとう', 'スタート'
+)
+YES_RE = re.compile("|".join(map(re.escape, YES_COMMANDS)), re.IGNORECASE)
+
 def test_voice_input():
     """音声認識をテスト"""
     print("🎤 音声認識テスト開始")
@@ -52,8 +61,11 @@ def test_voice_input():
         
         print("✅ 録音完了")
         
-        # ファイルサイズ確認
-        file_size = os.path.getsize(temp_file.name)
+        # ファイルサイズ確認（stat 1回で存在確認も兼ねる）
+        try:
+            file_size = os.stat(temp_file.name).st_size
+        except FileNotFoundError:
+            file_size = 0
         print(f"📊 音声ファイルサイズ: {file_size} bytes")
         
         if file_size < 1000:
@@ -73,13 +85,7 @@ def test_voice_input():
             print("✅ 音声認識成功！")
             
             # 「はい」判定テスト
-            text_lower = text.lower()
-            yes_commands = [
-                'はい', 'hai', 'yes', 'うん', 'そうです', 'オッケー', 'ok', 'そう', 'テスト',
-                'お願い', 'します', 'いたします', 'ください', '続行', '開始', 
-                'よろしく', 'いいよ', 'いいです', 'ありがとう', 'スタート'
-            ]
-            is_positive = any(word in text_lower for word in yes_commands)
+            is_positive = YES_RE.search(text) is not None
             
             print(f"📝 判定結果: {'✅ ポジティブ' if is_positive else '❌ ネガティブ'}")
         
@@ -87,8 +93,10 @@ def test_voice_input():
         print(f"❌ エラー: {e}")
     finally:
         # 一時ファイル削除
-        if os.path.exists(temp_file.name):
+        try:
             os.unlink(temp_file.name)
+        except FileNotFoundError:
+            pass
     
     print("\n🏁 テスト完了")
 
@@ -7,66 +7,203 @@ Final Voice Chat Bot for macOS ChatGPT App
 import time
 import subprocess
 import logging
+import logging.handlers
+import queue
+import atexit
 import threading
 import os
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import re
+import unicodedata
 from typing import Optional
-from datetime import datetime
 
-# 音声認識用のインポート
+# 発話区間検出（録音の早期終了用）
 try:
-    from faster_whisper import WhisperModel
-    VOICE_RECOGNITION_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: Voice recognition libraries not available: {e}")
-    VOICE_RECOGNITION_AVAILABLE = False
+    import webrtcvad
+    VAD_AVAILABLE = True
+except ImportError:
+    VAD_AVAILABLE = False
+    print("Warning: webrtcvad not available, recording full duration")
 
-# macOS用のインポート
+# プロセス内録音（PortAudio）。無ければffmpegで録音する
 try:
-    from AppKit import NSWorkspace, NSApplication
-    from Cocoa import NSPasteboard, NSStringPboardType
-    from Quartz.CoreGraphics import (
-        CGEventCreateKeyboardEvent, CGEventPost, kCGHIDEventTap,
-        CGEventTapCreate, kCGSessionEventTap, kCGHeadInsertEventTap,
-        kCGEventKeyDown, kCGEventKeyUp, kCGEventFlagsChanged,
-        CGEventGetIntegerValueField, kCGKeyboardEventKeycode,
-        CGEventGetFlags, kCGEventFlagMaskCommand
-    )
-    import objc
-    ACCESSIBILITY_AVAILABLE = True
-    QUARTZ_AVAILABLE = True
-except ImportError:
-    ACCESSIBILITY_AVAILABLE = False
-    QUARTZ_AVAILABLE = False
-    print("Warning: Accessibility frameworks not available")
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except (ImportError, OSError):
+    SOUNDDEVICE_AVAILABLE = False
 
-# ログ設定
+# 音声認識・macOSフレームワークは重いため初回使用時に読み込む（None: 未確認）
+VOICE_RECOGNITION_AVAILABLE = None
+ACCESSIBILITY_AVAILABLE = None
+QUARTZ_AVAILABLE = None
+
+# ログ設定（既定はWARNING、VCB_LOGLEVEL=INFO などで詳細化）
+# ファイル・コンソールへの書き込みはQueueListenerのスレッドで行い、呼び出し側を待たせない
+_log_queue = queue.SimpleQueue()
+# 不正なレベル名で起動時に落ちないよう、解釈できない値はWARNINGにする
+_log_level = logging.getLevelName(os.environ.get("VCB_LOGLEVEL", "WARNING").upper())
+if not isinstance(_log_level, int):
+    _log_level = logging.WARNING
 logging.basicConfig(
-    level=logging.INFO,
+    level=_log_level,
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('voice_chat_bot.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.FileHandler('voice_chat_bot.log'),
+    logging.StreamHandler()
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+def _ensure_whisper() -> bool:
+    """faster-whisperとNumPyを初回のみ読み込む"""
+    global VOICE_RECOGNITION_AVAILABLE, np, WhisperModel
+    if VOICE_RECOGNITION_AVAILABLE is None:
+        try:
+            import numpy as np
+            from faster_whisper import WhisperModel
+            VOICE_RECOGNITION_AVAILABLE = True
+        except ImportError as e:
+            print(f"Warning: Voice recognition libraries not available: {e}")
+            VOICE_RECOGNITION_AVAILABLE = False
+    return VOICE_RECOGNITION_AVAILABLE
+
+def _ensure_quartz() -> bool:
+    """AppKit・Quartz・CoreFoundationを初回のみ読み込む"""
+    global ACCESSIBILITY_AVAILABLE, QUARTZ_AVAILABLE
+    global NSWorkspace, NSPasteboard, NSStringPboardType
+    global CGEventCreateKeyboardEvent, CGEventPost, kCGHIDEventTap
+    global CGEventSourceCreate, kCGEventSourceStateHIDSystemState
+    global CGEventTapCreate, kCGSessionEventTap, kCGHeadInsertEventTap, kCGEventKeyDown
+    global CGEventGetIntegerValueField, kCGKeyboardEventKeycode
+    global CGEventGetFlags, kCGEventFlagMaskCommand
+    global CGEventMaskBit, CGEventTapEnable, kCGEventTapOptionListenOnly, kCGEventTapDisabledByTimeout
+    global CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly, kCGNullWindowID
+    global CFMachPortCreateRunLoopSource, CFRunLoopAddSource, CFRunLoopGetCurrent
+    global CFRunLoopRun, CFRunLoopStop, kCFRunLoopCommonModes
+    if QUARTZ_AVAILABLE is None:
+        try:
+            from AppKit import NSWorkspace
+            from Cocoa import NSPasteboard, NSStringPboardType
+            from Quartz.CoreGraphics import (
+                CGEventCreateKeyboardEvent, CGEventPost, kCGHIDEventTap,
+                CGEventSourceCreate, kCGEventSourceStateHIDSystemState,
+                CGEventTapCreate, kCGSessionEventTap, kCGHeadInsertEventTap, kCGEventKeyDown,
+                CGEventGetIntegerValueField, kCGKeyboardEventKeycode,
+                CGEventGetFlags, kCGEventFlagMaskCommand,
+                CGEventMaskBit, CGEventTapEnable, kCGEventTapOptionListenOnly,
+                kCGEventTapDisabledByTimeout,
+                CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly, kCGNullWindowID
+            )
+            from CoreFoundation import (
+                CFMachPortCreateRunLoopSource, CFRunLoopAddSource, CFRunLoopGetCurrent,
+                CFRunLoopRun, CFRunLoopStop, kCFRunLoopCommonModes
+            )
+            ACCESSIBILITY_AVAILABLE = True
+            QUARTZ_AVAILABLE = True
+        except ImportError:
+            ACCESSIBILITY_AVAILABLE = False
+            QUARTZ_AVAILABLE = False
+            print("Warning: Accessibility frameworks not available")
+    return QUARTZ_AVAILABLE
+
+# 音声コマンドの語彙（ひらがな・漢字・カタカナ対応）
+YES_COMMANDS = (
+    'はい', 'hai', 'yes', 'うん', 'そうです', 'オッケー', 'ok', 'そう',
+    'お願い', 'します', 'いたします', 'ください', '続行', '開始',
+    'よろしく', 'いいよ', 'いいです', 'ありがとう', 'スタート'
+)
+END_COMMANDS = (
+    '終了', 'しゅうりょう', 'シュウリョウ', 'SHUURYOU', 'しゅーりょー', 'シューリョー',
+    'おわり', 'オワリ', '終わり', 'end', 'finish', 'stop', 'やめ', 'ヤメ',
+    'キャンセル', 'cancel', 'ストップ', '中止', 'ちゅうし', 'チュウシ', 'だめ'
+)
+
+# 認識結果が語彙そのものの場合はハッシュ参照だけで判定する
+YES_SET = frozenset(w.casefold() for w in YES_COMMANDS)
+END_SET = frozenset(w.casefold() for w in END_COMMANDS)
+
+# 語彙を1本の正規表現にまとめ、1回の走査で判定する
+# （英字の大文字小文字はIGNORECASEで吸収し、text.lower()のコピーを作らない）
+_YES_RE = re.compile("|".join(map(re.escape, YES_COMMANDS)), re.IGNORECASE)
+_END_RE = re.compile("|".join(map(re.escape, END_COMMANDS)), re.IGNORECASE)
+
+# デコーダをコマンド語彙に寄せるためのプロンプト
+COMMAND_PROMPT = "答えは「はい」か「終了」です。"
+
+# 読み上げ用の文区切り（終端記号または改行まで）
+_SENTENCE_RE = re.compile(r'[^。！？!?\n]*[。！？!?\n]+')
+
+def sentence_stream(text: str, cursor: int = 0):
+    """text[cursor:]から完結した文を順に取り出し、(文, 次のcursor)を返す"""
+    for match in _SENTENCE_RE.finditer(text, cursor):
+        sentence = match.group().strip()
+        if sentence:
+            yield sentence, match.end()
+
+# Whisperモデルはプロセス内で1つだけ読み込んで使い回す
+_WHISPER_SINGLETON = None
+_WHISPER_LOCK = threading.Lock()
+
+def _get_whisper():
+    """共有Whisperモデルを取得（初回のみint8で読み込み、スレッドセーフ）"""
+    global _WHISPER_SINGLETON
+    if _WHISPER_SINGLETON is not None:
+        return _WHISPER_SINGLETON
+    with _WHISPER_LOCK:
+        if _WHISPER_SINGLETON is not None:
+            return _WHISPER_SINGLETON
+        if not _ensure_whisper():
+            raise ImportError("faster_whisper is not available")
+        start = time.monotonic()
+        _WHISPER_SINGLETON = WhisperModel(
+            "tiny", device="cpu", compute_type="int8",
+            cpu_threads=os.cpu_count() or 0, num_workers=1
+        )
+        logger.info("Whisper model (int8) loaded in %.2fs", time.monotonic() - start)
+    return _WHISPER_SINGLETON
+
+def _trim_silence(audio: "np.ndarray", sample_rate: int = 16000,
+                  threshold: float = 0.01) -> "np.ndarray":
+    """振幅の包絡線がしきい値を超える区間だけを切り出す（前後100msの余白付き）"""
+    if audio.size == 0:
+        return audio
+    WINDOW = sample_rate // 100  # 10msの移動平均で平滑化
+    MARGIN = sample_rate // 10
+    envelope = np.convolve(np.abs(audio), np.full(WINDOW, 1.0 / WINDOW, dtype=np.float32), mode='same')
+    voiced = np.flatnonzero(envelope > threshold)
+    if voiced.size == 0:
+        return audio[:0]
+    return audio[max(voiced[0] - MARGIN, 0):voiced[-1] + MARGIN]
+
+# 合成キーイベントの送信元（HIDシステム状態を共有し、1回だけ生成する）
+_KEY_EVENT_SOURCE = None
+
+def _key_event_source():
+    """キーイベント用のCGEventSourceを取得（初回のみ生成）"""
+    global _KEY_EVENT_SOURCE
+    if _KEY_EVENT_SOURCE is None:
+        _KEY_EVENT_SOURCE = CGEventSourceCreate(kCGEventSourceStateHIDSystemState)
+    return _KEY_EVENT_SOURCE
+
 # macOS Quartzを使用したキー送信関数（純粋実装）
 def press_key_quartz(keycode: int) -> bool:
     """Quartzを使用してキーを送信"""
-    if not QUARTZ_AVAILABLE:
+    if not _ensure_quartz():
         logger.error("Quartz not available")
         return False
     
     try:
-        # Key down
-        event = CGEventCreateKeyboardEvent(None, keycode, True)
-        CGEventPost(kCGHIDEventTap, event)
-        time.sleep(0.05)
+        source = _key_event_source()
+        key_down = CGEventCreateKeyboardEvent(source, keycode, True)
+        key_up = CGEventCreateKeyboardEvent(source, keycode, False)
         
-        # Key up
-        event = CGEventCreateKeyboardEvent(None, keycode, False)
-        CGEventPost(kCGHIDEventTap, event)
+        CGEventPost(kCGHIDEventTap, key_down)
+        time.sleep(0.005)
+        CGEventPost(kCGHIDEventTap, key_up)
         
         return True
     except Exception as e:
@@ -75,7 +212,7 @@ def press_key_quartz(keycode: int) -> bool:
 
 def start_dictation_quartz() -> bool:
     """Quartz使用して右コマンドキー2回で音声入力開始"""
-    if not QUARTZ_AVAILABLE:
+    if not _ensure_quartz():
         logger.error("Quartz not available for dictation start")
         return False
     
@@ -85,17 +222,17 @@ def start_dictation_quartz() -> bool:
         
         logger.info("Starting dictation with Quartz (Right Command x2)")
         
-        # 1回目
-        if not press_key_quartz(RIGHT_COMMAND_KEY):
-            logger.error("First right command key press failed")
-            return False
-        
-        time.sleep(0.1)  # 間隔（sample.pyと同じ）
-        
-        # 2回目
-        if not press_key_quartz(RIGHT_COMMAND_KEY):
-            logger.error("Second right command key press failed")
-            return False
+        # down/up/down/up の4イベントを先に生成し、送信の間にPython側の処理を挟まない
+        source = _key_event_source()
+        events = [
+            CGEventCreateKeyboardEvent(source, RIGHT_COMMAND_KEY, key_down)
+            for key_down in (True, False, True, False)
+        ]
+        # 押下保持5ms、タップ間隔30ms（ダブルタップ判定 <300ms に収まる）
+        for event, delay in zip(events, (0.005, 0.03, 0.005, 0)):
+            CGEventPost(kCGHIDEventTap, event)
+            if delay:
+                time.sleep(delay)
         
         logger.info("Right command key sequence completed")
         return True
@@ -104,9 +241,25 @@ def start_dictation_quartz() -> bool:
         logger.error(f"Dictation start failed: {e}")
         return False
 
+# 音声入力中に表示されるマイクHUDのウィンドウ所有プロセス名
+# （プロセス自体は初回使用後も常駐するため、画面上のウィンドウで判定する）
+DICTATION_WINDOW_OWNERS = frozenset(('DictationIM', 'Dictation'))
+
+def _dictation_hud_visible() -> bool:
+    """音声入力のマイクHUDが画面上に表示されているかを確認"""
+    if not _ensure_quartz():
+        return False
+    
+    try:
+        windows = CGWindowListCopyWindowInfo(kCGWindowListOptionOnScreenOnly, kCGNullWindowID) or ()
+        return any(w.get('kCGWindowOwnerName') in DICTATION_WINDOW_OWNERS for w in windows)
+    except Exception as e:
+        logger.error(f"Failed to check dictation HUD: {e}")
+        return False
+
 def stop_dictation_quartz() -> bool:
     """Quartz使用してEscapeキーで音声入力停止"""
-    if not QUARTZ_AVAILABLE:
+    if not _ensure_quartz():
         logger.error("Quartz not available for dictation stop")
         return False
     
@@ -132,34 +285,73 @@ class KeyboardMonitor:
     
     def __init__(self):
         self.is_monitoring = False
-        self.cmd_enter_pressed = False
         self.monitoring_thread = None
+        self.event_tap = None
+        self._run_loop = None
+        # Command+Enter検出を待機側へ即時に通知するイベント
+        self._cmd_enter_event = threading.Event()
+    
+    def _tap_callback(self, proxy, event_type, event, refcon):
+        """CGEventTapのコールバック（Command+Enterのみ検出）"""
+        if event_type == kCGEventTapDisabledByTimeout:
+            # 応答遅延でタップが無効化された場合は再有効化
+            CGEventTapEnable(self.event_tap, True)
+        elif event_type == kCGEventKeyDown:
+            ENTER_KEY = 36
+            keycode = CGEventGetIntegerValueField(event, kCGKeyboardEventKeycode)
+            if keycode == ENTER_KEY and CGEventGetFlags(event) & kCGEventFlagMaskCommand:
+                self.keyboard_event_handler()
+        return event
+    
+    def _run_event_tap(self, ready: threading.Event) -> None:
+        """バックグラウンドスレッドのCFRunLoopでイベントタップを動かす"""
+        self._run_loop = CFRunLoopGetCurrent()
+        source = CFMachPortCreateRunLoopSource(None, self.event_tap, 0)
+        CFRunLoopAddSource(self._run_loop, source, kCFRunLoopCommonModes)
+        CGEventTapEnable(self.event_tap, True)
+        ready.set()
+        CFRunLoopRun()
+    
+    def keyboard_event_handler(self) -> None:
+        """Command+Enterの検出を通知"""
+        self._cmd_enter_event.set()
         
-    def check_cmd_enter_simple(self) -> bool:
-        """シンプルなCommand+Enter検出（ポーリング方式）"""
+    def check_cmd_enter_simple(self, timeout: Optional[float] = None) -> bool:
+        """シンプルなCommand+Enter検出（イベント待機方式）"""
         try:
-            # 簡易実装：一定間隔でチェック
-            import time
-            while self.is_monitoring and not self.cmd_enter_pressed:
-                time.sleep(0.1)
-                # 実際のキー検出は省略し、フラグベースで動作
-                
-            return self.cmd_enter_pressed
+            return self._cmd_enter_event.wait(timeout)
         except Exception as e:
             logger.error(f"Simple command+enter check failed: {e}")
             return False
     
     def start_monitoring(self) -> bool:
-        """キーボード監視開始（簡易版）"""
+        """キーボード監視開始（CGEventTap、利用不可なら手動確認）"""
         try:
-            logger.info("Starting simple keyboard monitoring for Command+Enter...")
+            logger.info("Starting keyboard monitoring for Command+Enter...")
             print("⌨️ Command+Enter監視を開始しています...")
             
-            self.cmd_enter_pressed = False
+            self._cmd_enter_event.clear()
             self.is_monitoring = True
             
-            print("✅ Command+Enter監視が開始されました")
-            print("注意: Command+Enterを押してください")
+            if _ensure_quartz() and self.monitoring_thread is None:
+                self.event_tap = CGEventTapCreate(
+                    kCGSessionEventTap, kCGHeadInsertEventTap,
+                    kCGEventTapOptionListenOnly, CGEventMaskBit(kCGEventKeyDown),
+                    self._tap_callback, None
+                )
+                if self.event_tap is None:
+                    # アクセシビリティ権限がない場合は手動確認にフォールバック
+                    logger.warning("Event tap unavailable, falling back to manual confirmation")
+                else:
+                    ready = threading.Event()
+                    self.monitoring_thread = threading.Thread(
+                        target=self._run_event_tap, args=(ready,), daemon=True
+                    )
+                    self.monitoring_thread.start()
+                    ready.wait()
+            
+            print("✅ Command+Enter監視が開始されました\n"
+                  "注意: Command+Enterを押してください")
             return True
                 
         except Exception as e:
@@ -170,6 +362,13 @@ class KeyboardMonitor:
         """キーボード監視停止"""
         try:
             self.is_monitoring = False
+            if self.monitoring_thread is not None:
+                CGEventTapEnable(self.event_tap, False)
+                CFRunLoopStop(self._run_loop)
+                self.monitoring_thread.join()
+                self.monitoring_thread = None
+                self.event_tap = None
+                self._run_loop = None
             logger.info("Keyboard monitoring stopped")
             print("⌨️ Command+Enter監視を停止しました")
                 
@@ -177,16 +376,23 @@ class KeyboardMonitor:
             logger.error(f"Failed to stop keyboard monitoring: {e}")
     
     def wait_for_cmd_enter(self, timeout: int = 60) -> bool:
-        """Command+Enterが押されるまで待機（手動確認版）"""
-        start_time = time.time()
+        """Command+Enterが押されるまで待機"""
+        print("🎯 Command+Enterを押してください...\n"
+              "（音声入力を停止して質問を送信します）")
         
-        print("🎯 Command+Enterを押してください...")
-        print("（音声入力を停止して質問を送信します）")
+        # イベントタップが動作中ならキー入力を直接待機
+        if self.monitoring_thread is not None:
+            try:
+                return self._cmd_enter_event.wait(timeout)
+            except KeyboardInterrupt:
+                logger.warning("Command+Enter wait interrupted")
+                return False
         
         # 手動でCommand+Enterが押されたことを確認
         try:
             input("Command+Enterを押したらEnterキーを押してください: ")
             logger.info("Manual Command+Enter confirmation received")
+            self.keyboard_event_handler()
             return True
         except KeyboardInterrupt:
             logger.warning("Command+Enter wait interrupted")
@@ -198,95 +404,223 @@ class VoiceCommandRecognizer:
     def __init__(self):
         self.model = None
         
-        if VOICE_RECOGNITION_AVAILABLE:
+        if _ensure_whisper():
             try:
-                # Whisperモデルを初期化（軽量版）
-                self.model = WhisperModel("tiny", device="cpu")
+                # 共有Whisperモデルを取得（軽量版・int8）
+                self.model = _get_whisper()
                 logger.info("Whisper model loaded successfully")
             except Exception as e:
                 logger.error(f"Failed to load Whisper model: {e}")
                 self.model = None
         
+        # 録音と文字起こしを並行させるためのワーカー
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        
         logger.info("VoiceCommandRecognizer initialized (macOS recording + Whisper)")
     
-    def record_audio_macos(self, duration: int = 10) -> str:
-        """macOSのrecコマンドで音声録音"""
+    def warmup(self) -> None:
+        """無音1秒でダミー推論し、初回の文字起こしの初期化コストを先に払う"""
+        if not self.model:
+            return
         try:
-            # 一時ファイル作成
-            temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            temp_file.close()
-            
-            print(f"🎤 音声録音中... ({duration}秒)")
-            print("「はい」または「終了」と話してください")
-            print("ゆっくりとはっきり話してください")
-            print("録音開始！ 📣")
-            
-            # macOSのrecコマンドで録音
-            cmd = [
-                'rec', 
-                temp_file.name,
-                'trim', '0', str(duration)
-            ]
+            start = time.monotonic()
+            segments, _ = self.model.transcribe(
+                np.zeros(16000, dtype=np.float32), language="ja", beam_size=1
+            )
+            # segmentsは遅延ジェネレータなので消費して推論を走らせる
+            for _ in segments:
+                pass
+            logger.info("Whisper warmup finished in %.2fs", time.monotonic() - start)
+        except Exception as e:
+            logger.error(f"Whisper warmup failed: {e}")
+    
+    def record_audio_macos(self, duration: int = 10,
+                           stop_event: Optional[threading.Event] = None,
+                           early_silence_stop_ms: Optional[int] = None) -> Optional["np.ndarray"]:
+        """マイクから16kHzモノラル音声をメモリ上に録音（sounddevice / ffmpeg）
+        
+        early_silence_stop_ms を指定すると、その時間内に発話が始まらなければ録音を打ち切る
+        """
+        try:
+            # 案内は1回の書き込みにまとめる
+            print(f"🎤 音声録音中... ({duration}秒)\n"
+                  "「はい」または「終了」と話してください\n"
+                  "ゆっくりとはっきり話してください\n"
+                  "録音開始！ 📣")
             
+            SAMPLE_RATE = 16000
+            FRAME_MS = 30
+            FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 * 2  # 30ms分の16bit PCM
+            SILENCE_FRAMES = 10                  # 発話後300msの無音で終了
+            PREROLL_FRAMES = 5                   # 発話開始前に残す150ms
+            
+            vad = webrtcvad.Vad(2) if VAD_AVAILABLE else None
+            frames = []
+            heard_speech = False
+            silent_run = 0
+            frame_count = 0
+            
+            source = self._capture_frames(duration, SAMPLE_RATE, FRAME_BYTES)
             try:
-                subprocess.run(cmd, check=True, capture_output=True)
-                print("✅ 録音完了！")
-                return temp_file.name
-            except subprocess.CalledProcessError:
-                # recコマンドが利用できない場合
+                for frame in source:
+                    frames.append(frame)
+                    frame_count += 1
+                    
+                    # 呼び出し側から録音の打ち切りを指示された場合
+                    if stop_event is not None and stop_event.is_set():
+                        break
+                    if vad is None:
+                        continue
+                    if vad.is_speech(frame, SAMPLE_RATE):
+                        heard_speech = True
+                        silent_run = 0
+                    elif heard_speech:
+                        silent_run += 1
+                        if silent_run >= SILENCE_FRAMES:
+                            break
+                    else:
+                        # 発話前の無音は直前の数フレームだけ保持する
+                        del frames[:-PREROLL_FRAMES]
+                        if early_silence_stop_ms is not None and frame_count * FRAME_MS >= early_silence_stop_ms:
+                            break
+            finally:
+                # 途中で抜けた場合も録音デバイス・ffmpegを確実に閉じる
+                source.close()
+            
+            if not frames:
                 print("録音機能が利用できません。")
                 return None
+            
+            print("✅ 録音完了！")
+            if vad is not None and not heard_speech:
+                # 発話なし：無音をデコードさせない（プロンプト語の誤出力防止）
+                return np.zeros(0, dtype=np.float32)
+            pcm = np.frombuffer(b"".join(frames), dtype=np.int16)
+            audio = pcm.astype(np.float32) / 32768.0
+            if vad is None:
+                # VADなしで全区間を録音した場合、前後の無音を削ってエンコーダ入力を短くする
+                audio = _trim_silence(audio, SAMPLE_RATE)
+            return audio
                 
         except Exception as e:
             logger.error(f"macOS recording failed: {e}")
             return None
     
+    @staticmethod
+    def _capture_frames(duration: int, sample_rate: int, frame_bytes: int):
+        """16bitモノラルPCMをframe_bytesずつ返す（sounddevice優先、無ければffmpeg）"""
+        if SOUNDDEVICE_AVAILABLE:
+            # プロセス起動なしでPortAudioから直接読み込む
+            frame_samples = frame_bytes // 2
+            with sd.RawInputStream(samplerate=sample_rate, channels=1, dtype='int16',
+                                   blocksize=frame_samples) as stream:
+                for _ in range(duration * sample_rate // frame_samples):
+                    data, _overflowed = stream.read(frame_samples)
+                    yield bytes(data)
+            return
+        
+        # 一時ファイルを介さず、16bit PCMを標準出力で直接受け取る
+        cmd = [
+            'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+            '-f', 'avfoundation', '-i', ':default',
+            '-t', str(duration),
+            '-ac', '1', '-ar', str(sample_rate),
+            '-f', 's16le', 'pipe:1'
+        ]
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1 << 16)
+        except FileNotFoundError:
+            # ffmpegが利用できない場合は何も返さない
+            return
+        try:
+            while True:
+                frame = proc.stdout.read(frame_bytes)
+                if len(frame) < frame_bytes:
+                    break
+                yield frame
+        finally:
+            if proc.poll() is None:
+                proc.terminate()
+            proc.wait()
+    
+    @staticmethod
+    def _judge_command(text: Optional[str]) -> Optional[str]:
+        """認識結果を「はい」「終了」に分類（判定できなければNone）"""
+        if not text:
+            return None
+        # 全角英数・半角カナをNFKCで揃える（「ＯＫ」→「OK」）
+        text = unicodedata.normalize('NFKC', text)
+        word = text.casefold().strip("。、.,!?！？ ")
+        if word in END_SET:
+            return "終了"
+        if word in YES_SET:
+            return "はい"
+        # 「終了します」などを「はい」と誤判定しないよう終了判定を優先
+        if _END_RE.search(text):
+            return "終了"
+        if _YES_RE.search(text):
+            return "はい"
+        return None
+    
     def _keyboard_fallback(self) -> str:
         """音声認識失敗時の再試行処理"""
-        print("音声認識が利用できません。")
-        print("もう一度音声で「はい」または「終了」と話してください...")
+        print("音声認識が利用できません。\n"
+              "もう一度音声で「はい」または「終了」と話してください...")
         
-        # 音声認識を再試行（簡易版）
-        for attempt in range(3):
+        # 音声認識を再試行（前回分の文字起こし中に次の録音を進める）
+        # 録音時間は徐々に短くし、1秒以内に話し始めなければその回は打ち切る
+        pending = None
+        for attempt, duration in enumerate((4, 2, 1)):
             print(f"再試行 {attempt + 1}/3:")
-            time.sleep(1)
-            audio_file = self.record_audio_macos(duration=8)  # 再試行は少し短く
-            if audio_file:
-                text = self.transcribe_audio(audio_file)
-                if text:
-                    text_lower = text.lower()
-                    yes_commands = [
-                        'はい', 'hai', 'yes', 'うん', 'そうです', 'オッケー', 'ok', 'そう',
-                        'お願い', 'します', 'いたします', 'ください', '続行', '開始', 
-                        'よろしく', 'いいよ', 'いいです', 'ありがとう', 'スタート'
-                    ]
-                    if any(yes_word in text_lower for yes_word in yes_commands):
-                        return "はい"
-                    # 明確に「終了」系の場合（ひらがな・漢字・カタカナ対応）
-                    end_commands = [
-                        '終了', 'しゅうりょう', 'シュウリョウ', 'SHUURYOU', 'しゅーりょー', 'シューリョー',
-                        'おわり', 'オワリ', '終わり', 'end', 'finish', 'stop', 'やめ', 'ヤメ',
-                        'キャンセル', 'cancel', 'ストップ', '中止', 'ちゅうし', 'チュウシ', 'だめ'
-                    ]
-                    if any(end_word in text_lower for end_word in end_commands):
-                        return "終了"
+            stop_recording = threading.Event()
+            recording = self._executor.submit(
+                self.record_audio_macos, duration, stop_recording, 1000
+            )
+            
+            if pending is not None:
+                result = self._judge_command(pending.result())
+                if result:
+                    # 前回分で判定できたので今回の録音は打ち切る
+                    stop_recording.set()
+                    recording.result()
+                    return result
+            
+            audio = recording.result()
+            pending = self._executor.submit(self.transcribe_audio, audio) if audio is not None else None
+        
+        if pending is not None:
+            result = self._judge_command(pending.result())
+            if result:
+                return result
         
         print("音声認識に3回失敗しました。デフォルトで「終了」として処理します。")
         return "終了"
     
-    def transcribe_audio(self, audio_file: str) -> Optional[str]:
-        """音声ファイルをテキストに変換"""
+    def transcribe_audio(self, audio: "np.ndarray") -> Optional[str]:
+        """録音した音声（float32配列）をテキストに変換"""
         try:
-            if not self.model or not audio_file or not os.path.exists(audio_file):
+            if not self.model or audio is None or audio.size == 0:
                 return None
             
-            segments, _ = self.model.transcribe(audio_file, language="ja")
-            text = " ".join([segment.text for segment in segments])
+            # 短いコマンド用：greedy decode
+            # 録音側でVADが効いている場合、Whisper側のVADは不要
+            segments, _ = self.model.transcribe(
+                audio, language="ja",
+                beam_size=1, best_of=1, temperature=0,
+                vad_filter=not VAD_AVAILABLE,
+                vad_parameters={"min_silence_duration_ms": 200},
+                condition_on_previous_text=False, without_timestamps=True,
+                initial_prompt=COMMAND_PROMPT,
+                max_new_tokens=8  # コマンドは数トークンで収まる
+            )
+            # セグメントは逐次デコードされるため、コマンド語が出た時点で打ち切る
+            parts = []
+            for segment in segments:
+                parts.append(segment.text)
+                if _YES_RE.search(segment.text) or _END_RE.search(segment.text):
+                    break
             
-            # 一時ファイルを削除
-            os.unlink(audio_file)
-            
-            return text.strip()
+            return "".join(parts).strip()
             
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
@@ -295,45 +629,26 @@ class VoiceCommandRecognizer:
     def wait_for_yes_command(self, timeout: int = 60) -> bool:
         """「はい」コマンドを待機（完全音声認識のみ）"""
         try:
-            if not VOICE_RECOGNITION_AVAILABLE:
+            if not _ensure_whisper():
                 # 音声認識が利用できない場合は音声で再試行
                 result_text = self._keyboard_fallback()
                 return result_text == "はい"
             
             # 音声録音
-            audio_file = self.record_audio_macos(duration=2)
+            audio = self.record_audio_macos(duration=2)
             
-            if not audio_file:
+            if audio is None:
                 # 録音失敗時は音声で再試行
                 result_text = self._keyboard_fallback()
                 return result_text == "はい"
             
             # 音声認識
-            text = self.transcribe_audio(audio_file)
+            text = self.transcribe_audio(audio)
             
             if text:
-                text_lower = text.lower()
-                yes_commands = [
-                    'はい', 'hai', 'yes', 'うん', 'そうです', 'オッケー', 'ok', 'そう',
-                    'お願い', 'します', 'いたします', 'ください', '続行', '開始', 
-                    'よろしく', 'いいよ', 'いいです', 'ありがとう', 'スタート'
-                ]
-                
-                # 終了コマンドの検出（ひらがな・漢字・カタカナ対応）
-                end_commands = [
-                    '終了', 'しゅうりょう', 'シュウリョウ', 'SHUURYOU', 'しゅーりょー', 'シューリョー',
-                    'おわり', 'オワリ', '終わり', 'end', 'finish', 'stop', 'やめ', 'ヤメ',
-                    'キャンセル', 'cancel', 'ストップ', '中止', 'ちゅうし', 'チュウシ'
-                ]
-                
-                # 終了判定を優先
-                if any(end_word in text_lower for end_word in end_commands):
-                    print(f"音声認識結果: '{text}' → 判定: 終了")
-                    return False
-                
-                result = any(yes_word in text_lower for yes_word in yes_commands)
-                print(f"音声認識結果: '{text}' → 判定: {'はい' if result else '終了'}")
-                return result
+                verdict = self._judge_command(text)
+                print(f"音声認識結果: '{text}' → 判定: {verdict or '終了'}")
+                return verdict == "はい"
             else:
                 print("音声認識に失敗しました")
                 result_text = self._keyboard_fallback()
@@ -350,16 +665,30 @@ class ChatGPTResponseExtractor:
     def __init__(self):
         self.chatgpt_bundle_id = "com.openai.chat"
         self.last_response = ""
+        # is_chatgpt_active の結果を短時間キャッシュ（Python↔ObjCの往復削減）
+        self._last_check_ts = 0.0
+        self._last_check_result = False
+        # クリップボードの変更カウンタ（内容を読まずに変更を検知する）
+        self._last_change_count = None
+        if _ensure_quartz():
+            self._last_change_count = NSPasteboard.generalPasteboard().changeCount()
         
     def is_chatgpt_active(self) -> bool:
-        """ChatGPTアプリがアクティブかチェック"""
-        if not ACCESSIBILITY_AVAILABLE:
+        """ChatGPTアプリがアクティブかチェック（250msキャッシュ）"""
+        if not _ensure_quartz():
             return False
+        
+        now = time.monotonic()
+        if now - self._last_check_ts < 0.25:
+            return self._last_check_result
             
         try:
             workspace = NSWorkspace.sharedWorkspace()
             active_app = workspace.frontmostApplication()
-            return active_app.bundleIdentifier() == self.chatgpt_bundle_id
+            result = active_app.bundleIdentifier() == self.chatgpt_bundle_id
+            self._last_check_ts = now
+            self._last_check_result = result
+            return result
         except Exception as e:
             logger.error(f"Failed to check active app: {e}")
             return False
@@ -367,32 +696,65 @@ class ChatGPTResponseExtractor:
     def get_response_via_clipboard(self) -> Optional[str]:
         """クリップボード経由で回答を取得"""
         try:
-            if ACCESSIBILITY_AVAILABLE:
+            if _ensure_quartz():
                 pasteboard = NSPasteboard.generalPasteboard()
+                change_count = pasteboard.changeCount()
+                # 変更カウンタが同じならクリップボードは未更新（本文を読まない）
+                if change_count == self._last_change_count:
+                    return None
+                self._last_change_count = change_count
                 content = pasteboard.stringForType_(NSStringPboardType)
             else:
                 result = subprocess.run(['pbpaste'], capture_output=True, text=True)
                 content = result.stdout.strip()
             
-            if content and content != self.last_response:
-                self.last_response = content
-                return content
+            if not content:
+                return None
             
-            return None
+            # 前回と同じ回答でもユーザーがコピーし直したものなので、そのまま読み上げる
+            if content == self.last_response:
+                logger.info("Clipboard content is the same as the previous response")
+            self.last_response = content
+            return content
             
         except Exception as e:
             logger.error(f"Clipboard access error: {e}")
             return None
     
-    def wait_for_response_ready(self) -> bool:
-        """回答準備完了の確認（完全音声認識のみ）"""
-        print("\nChatGPTの回答が完了したら:")
-        print("1. 回答全体を選択（Cmd+A またはマウスで選択）")
-        print("2. コピー（Cmd+C）")
-        print("3. 「はい」と音声で答えてください（「終了」で終了）")
+    def wait_for_clipboard_change(self, baseline: int, timeout: float = 120) -> bool:
+        """変更カウンタがbaselineから変わるまで50ms間隔で監視"""
+        if not _ensure_quartz():
+            return False
         
-        # 音声認識で確認
-        recognizer = VoiceCommandRecognizer()
+        pasteboard = NSPasteboard.generalPasteboard()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if pasteboard.changeCount() != baseline:
+                return True
+            time.sleep(0.05)
+        return False
+    
+    def wait_for_response_ready(self, recognizer: VoiceCommandRecognizer) -> bool:
+        """回答準備完了の確認（コピー検知、利用不可なら音声認識）"""
+        if _ensure_quartz():
+            # 質問送信直後の変更カウンタを基準にする
+            # （セットアップ中や質問入力中のコピーを回答と取り違えない）
+            baseline = NSPasteboard.generalPasteboard().changeCount()
+            self._last_change_count = baseline
+            print("\nChatGPTの回答が完了したら:\n"
+                  "1. 回答全体を選択（Cmd+A またはマウスで選択）\n"
+                  "2. コピー（Cmd+C）→ 自動で読み上げます")
+            
+            if self.wait_for_clipboard_change(baseline):
+                return True
+            print("⚠️ コピーが検出されませんでした。音声で確認します")
+        
+        print("\nChatGPTの回答が完了したら:\n"
+              "1. 回答全体を選択（Cmd+A またはマウスで選択）\n"
+              "2. コピー（Cmd+C）\n"
+              "3. 「はい」と音声で答えてください（「終了」で終了）")
+        
+        # 音声認識で確認（呼び出し元の認識器を使い回す）
         return recognizer.wait_for_yes_command()
 
 class NativeDictationController:
@@ -411,27 +773,36 @@ class NativeDictationController:
         """純正音声入力を開始（Quartz純粋実装）"""
         try:
             logger.info("Starting native dictation...")
-            print("🎤 macOS音声入力を開始しています...")
-            
             # Quartz（macOSネイティブAPI）で右コマンドキー2回押し
-            print("Quartz（macOSネイティブAPI）で右コマンドキー2回押し...")
+            print("🎤 macOS音声入力を開始しています...\n"
+                  "Quartz（macOSネイティブAPI）で右コマンドキー2回押し...")
             
-            if not QUARTZ_AVAILABLE:
+            if not _ensure_quartz():
                 print("❌ Quartzが利用できません")
-                print("💡 手動で音声入力を開始してください：")
-                print("   - 右コマンドキーを2回素早く押す")
+                print("💡 手動で音声入力を開始してください：\n"
+                      "   - 右コマンドキーを2回素早く押す")
                 return False
             
+            # キー送信前の状態を記録し、送信後に表示へ切り替わったことを起動の合図とする
+            hud_was_visible = _dictation_hud_visible()
+            
             if start_dictation_quartz():
                 print("✅ Quartz経由で右コマンドキー送信完了")
             else:
                 print("❌ Quartz経由でのキー送信に失敗しました")
-                print("💡 手動で音声入力を開始してください：")
-                print("   - 右コマンドキーを2回素早く押す")
+                print("💡 手動で音声入力を開始してください：\n"
+                      "   - 右コマンドキーを2回素早く押す")
                 return False
             
             print("音声入力の起動を待機中...")
-            time.sleep(2)
+            # HUDが非表示→表示に変わったら即座に進む。
+            # 変化を確認できない場合（送信前から表示中・HUD未検出）は従来どおり2秒待つ
+            SETTLE_SECONDS = 2.0
+            deadline = time.monotonic() + SETTLE_SECONDS
+            while time.monotonic() < deadline:
+                if not hud_was_visible and _dictation_hud_visible():
+                    break
+                time.sleep(0.05)
             
             print("✅ 音声入力①の起動処理が完了しました（Quartz右コマンドキー方式）")
             return True
@@ -447,7 +818,7 @@ class NativeDictationController:
             print("音声入力①を停止中...")
             
             # Quartz（macOSネイティブAPI）でEscapeキーを送信
-            if not QUARTZ_AVAILABLE:
+            if not _ensure_quartz():
                 print("❌ Quartzが利用できません")
                 print("💡 手動で音声入力を停止してください：Escapeキーを押す")
                 return False
@@ -480,8 +851,8 @@ class NativeDictationController:
             print("❌ キーボード監視に失敗しました")
             return False
         
-        print("Command+Enterを押すと質問が送信されます...")
-        print("（他の操作では自動終了しません）")
+        print("Command+Enterを押すと質問が送信されます...\n"
+              "（他の操作では自動終了しません）")
         
         # Command+Enterが押されるまで待機（のみ）
         if self.keyboard_monitor.wait_for_cmd_enter(timeout):
@@ -509,29 +880,50 @@ class FinalVoiceChatBot:
     
     def __init__(self):
         self.voice_commands = VoiceCommandRecognizer()
+        # 説明を読んでいる間にWhisperのウォームアップを済ませる
+        threading.Thread(target=self.voice_commands.warmup, daemon=True).start()
         self.response_extractor = ChatGPTResponseExtractor()
         self.dictation_controller = NativeDictationController()
         self.is_running = False
+        # 次の発話用に標準入力待ちのsayを先行起動しておく
+        self._say = self._spawn_say()
         
         logger.info("FinalVoiceChatBot initialized")
     
+    def _spawn_say(self) -> Optional[subprocess.Popen]:
+        """標準入力から読み上げるsayプロセスを起動"""
+        try:
+            return subprocess.Popen(['say'], stdin=subprocess.PIPE, text=True)
+        except Exception as e:
+            logger.error(f"Failed to spawn say: {e}")
+            return None
+    
     def speak_text(self, text: str) -> None:
-        """テキストを読み上げ"""
+        """テキストを読み上げ（先行起動したsayに流し込み、完了まで待機）"""
+        proc = self._say
+        self._say = None
         try:
-            logger.info(f"Speaking: {text[:50]}...")
+            logger.info("Speaking: %.50s...", text)
             print(f"🔊 読み上げ: {text[:50]}...")
             
-            # sayコマンドを実行
-            result = subprocess.run(['say', text], timeout=30, check=False)
+            # 先行起動したsayが使えなければその場で起動
+            if proc is None or proc.poll() is not None:
+                proc = subprocess.Popen(['say'], stdin=subprocess.PIPE, text=True)
+            
+            proc.stdin.write(text)
+            proc.stdin.close()
+            returncode = proc.wait(timeout=30)
             
-            if result.returncode == 0:
+            if returncode == 0:
                 logger.info("Speech completed")
                 print("✅ 読み上げ完了")
             else:
-                logger.warning(f"Speech command returned {result.returncode}")
+                logger.warning("Speech command returned %s", returncode)
                 print("⚠️ 読み上げ警告")
                 
         except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()  # 終了を回収してゾンビを残さない
             logger.warning("Speech timeout")
             print("⚠️ 読み上げタイムアウト")
         except Exception as e:
@@ -539,6 +931,55 @@ class FinalVoiceChatBot:
             print(f"❌ 読み上げエラー: {e}")
             # フォールバック: テキストを表示
             print(f"📝 メッセージ: {text}")
+        finally:
+            # 読み上げ中の待ち時間に次のsayを起動しておく
+            self._say = self._spawn_say()
+    
+    def speak_response(self, text: str) -> None:
+        """長い回答を1つのsayに文単位で流し込んで読み上げ（最初の文からすぐ再生を始める）"""
+        proc = self._say
+        self._say = None
+        try:
+            logger.info("Speaking response: %.50s...", text)
+            print(f"🔊 読み上げ: {text[:50]}...")
+            
+            # 先行起動したsayが使えなければその場で起動
+            if proc is None or proc.poll() is not None:
+                proc = subprocess.Popen(['say'], stdin=subprocess.PIPE, text=True)
+            
+            # 文ごとに書き込んでflushし、sayの再生を止めずに続きを渡す
+            cursor = 0
+            for sentence, cursor in sentence_stream(text):
+                proc.stdin.write(sentence + "\n")
+                proc.stdin.flush()
+            
+            # 終端記号のない末尾
+            tail = text[cursor:].strip()
+            if tail:
+                proc.stdin.write(tail + "\n")
+            proc.stdin.close()
+            
+            # 全文の読み上げ完了を1回だけ待つ（長い回答のため上限は文字数に応じて延ばす）
+            returncode = proc.wait(timeout=30 + len(text) // 5)
+            
+            if returncode == 0:
+                logger.info("Speech completed")
+                print("✅ 読み上げ完了")
+            else:
+                logger.warning("Speech command returned %s", returncode)
+                print("⚠️ 読み上げ警告")
+                
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()  # 終了を回収してゾンビを残さない
+            logger.warning("Speech timeout")
+            print("⚠️ 読み上げタイムアウト")
+        except Exception as e:
+            logger.error(f"Speech failed: {e}")
+            print(f"❌ 読み上げエラー: {e}")
+        finally:
+            # 次の発話用のsayを起動しておく
+            self._say = self._spawn_say()
     
     def setup_phase(self) -> bool:
         """初期セットアップフェーズ"""
@@ -596,7 +1037,7 @@ class FinalVoiceChatBot:
             print("回答が完了したら自動的に読み上げます...")
             
             # 回答準備の確認
-            if self.response_extractor.wait_for_response_ready():
+            if self.response_extractor.wait_for_response_ready(self.voice_commands):
                 response = self.response_extractor.get_response_via_clipboard()
                 
                 if response:
@@ -605,9 +1046,9 @@ class FinalVoiceChatBot:
                     print(response)
                     print("-" * 40)
                     
-                    # 4. 回答を即座に読み上げ
+                    # 4. 回答を即座に読み上げ（文単位）
                     print("\n🔊 回答を読み上げ中...")
-                    self.speak_text(response)
+                    self.speak_response(response)
                     
                     print("✅ 読み上げ完了")
                     return True
@@ -686,6 +1127,9 @@ class FinalVoiceChatBot:
         """クリーンアップ"""
         self.is_running = False
         self.dictation_controller.stop_dictation()
+        if self._say is not None:
+            self._say.terminate()
+            self._say = None
         logger.info("FinalVoiceChatBot stopped")
 
 def main():
@@ -7,48 +7,65 @@ VoiceChatBot - Simple Voice-Controlled ChatGPT Automation for macOS
 import time
 import subprocess
 import logging
-import tempfile
 import os
 import threading
+import queue
+import collections
+import re
 from typing import Optional
-import glob
-from datetime import datetime
+
+# CTranslate2（OpenMP）のスレッド数をコア数に合わせ、待機中のスピンを止める
+# （faster_whisperの読み込み前に設定する必要がある）
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count() or 4))
+os.environ.setdefault("OMP_WAIT_POLICY", "PASSIVE")
 
 # 音声認識用のインポート
 try:
-    from faster_whisper import WhisperModel
+    import numpy as np
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
     VOICE_RECOGNITION_AVAILABLE = True
 except ImportError:
     VOICE_RECOGNITION_AVAILABLE = False
     print("Warning: Voice recognition not available")
 
+# プロセス内録音（PortAudio）。無ければrecの標準出力から受け取る
+try:
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except (ImportError, OSError):
+    SOUNDDEVICE_AVAILABLE = False
+
 # macOS用のインポート
 try:
     from Quartz.CoreGraphics import CGEventCreateKeyboardEvent, CGEventPost, kCGHIDEventTap
-    from Quartz.CoreGraphics import CGEventTapCreate, kCGHeadInsertEventTap, kCGEventTapOptionDefault
-    from Quartz.CoreGraphics import CGEventMaskBit, kCGEventKeyDown, CGEventGetIntegerValueField, kCGKeyboardEventKeycode
-    import Quartz
+    from Quartz.CoreGraphics import CGEventSetFlags, kCGEventFlagMaskCommand
     QUARTZ_AVAILABLE = True
 except ImportError:
     QUARTZ_AVAILABLE = False
     print("Warning: Quartz not available")
 
-# Vision Framework用のインポート
+# 画面操作（スクロール・画像検索・クリック）用のインポート
 try:
-    import Vision
-    from Foundation import NSURL, NSData, NSString
-    from Cocoa import NSImage
-    VISION_AVAILABLE = True
+    import pyautogui
+    from PIL import Image
+    # 呼び出しごとの暗黙の0.1秒待機を無効化（FAILSAFEは有効のまま）
+    pyautogui.PAUSE = 0
+    PYAUTOGUI_AVAILABLE = True
+except Exception as e:
+    # 画面なし・アクセシビリティ権限なしの環境ではImportError以外も送出される
+    PYAUTOGUI_AVAILABLE = False
+    print(f"Warning: PyAutoGUI not available: {e}")
+
+# テンプレートマッチングを直接呼ぶためのOpenCV（無ければPyAutoGUI経由）
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
 except ImportError:
-    try:
-        # PyObjCライブラリが不完全な場合のフォールバック
-        from Cocoa import NSString
-        from Foundation import NSURL, NSData
-        VISION_AVAILABLE = False
-        print("Warning: Vision framework not fully available, using fallback OCR")
-    except ImportError:
-        VISION_AVAILABLE = False
-        print("Warning: Vision framework and Foundation not available")
+    CV2_AVAILABLE = False
+
+# 画像検索結果の矩形（PyAutoGUIのBoxと同じ並び）
+Box = collections.namedtuple("Box", "left top width height")
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
@@ -57,62 +74,183 @@ logger = logging.getLogger(__name__)
 # faster_whisperのログを非表示にする
 logging.getLogger("faster_whisper").setLevel(logging.WARNING)
 
+# デバッグ出力（スクリーンショット保存など）はVBOT_DEBUG=1の時だけ行う
+DEBUG_MODE = os.environ.get("VBOT_DEBUG") == "1"
+
+# 音声確認の語彙（「はい」系・終わり系）
+YES_COMMANDS = ('はい', 'hai', 'yes', 'うん', 'そうです', 'オッケー', 'ok')
+END_COMMANDS = ('終わり', 'おわり', 'オワリ', 'キャンセル', 'cancel', 'いいえ', 'no')
+
+# 語彙を1本の正規表現にまとめ、1回の走査で判定する（英字はIGNORECASEで吸収）
+_YES_RE = re.compile("|".join(map(re.escape, YES_COMMANDS)), re.IGNORECASE)
+_END_RE = re.compile("|".join(map(re.escape, END_COMMANDS)), re.IGNORECASE)
+
+# 短い発話のキーワード判定用デコード設定（greedy・タイムスタンプなし）
+_FAST_KW_OPTS = dict(
+    language="ja", beam_size=1, best_of=1, without_timestamps=True,
+    condition_on_previous_text=False, no_speech_threshold=0.5
+)
+
+# Whisperモデルはプロセス内で1つだけ読み込んで使い回す
+_WHISPER_MODEL = None
+_WHISPER_LOCK = threading.Lock()
+
+def _get_whisper():
+    """共有Whisperモデルを取得（初回のみint8で読み込み、スレッドセーフ）"""
+    global _WHISPER_MODEL
+    if _WHISPER_MODEL is not None:
+        return _WHISPER_MODEL
+    with _WHISPER_LOCK:
+        if _WHISPER_MODEL is None:
+            # CPU向けにint8量子化で読み込む（精度はコマンド判定に十分）
+            # VCB_COMPUTE_TYPEで変更可能（例: int8_float16, float16）
+            compute_type = os.environ.get("VCB_COMPUTE_TYPE", "int8")
+            _WHISPER_MODEL = WhisperModel(
+                "tiny", device="cpu", compute_type=compute_type,
+                cpu_threads=os.cpu_count() or 0, num_workers=1
+            )
+    return _WHISPER_MODEL
+
 class VoiceBot:
     """シンプル音声ボット"""
     
     def __init__(self):
         self.whisper_model = None
+        self.pipe = None
         self.background_thread = None
-        self.stop_monitoring = False
+        # 音声監視の停止通知（待機側は即座に起きる）
+        self._stop_evt = threading.Event()
+        # 「終わり」を実際に検知した場合のみTrue（この時だけ送信する）
+        self._end_detected = False
         self.keyboard_monitoring = False
         self.screenshot_waiting = False
+        # 検索用ボタン画像（パスごとに初回のみ読み込む）
+        self._button_templates = {}
+        # 単発で押すキーのイベントは (キーコード, 押下) ごとに不変なので起動時に一度だけ生成する
+        # （生成時のタイムスタンプのまま送られるが、単発の押下・解放は間隔判定を受けないため影響しない。
+        #   タップ間隔で判定される右Commandのダブルタップは start_dictation で毎回生成する）
+        self._kevents = {}
+        # 送信用のCmd+Enter（Commandフラグ付きEnterの押下・解放）
+        self._cmd_enter_events = ()
+        if QUARTZ_AVAILABLE:
+            for key_down in (True, False):
+                self._kevents[(53, key_down)] = CGEventCreateKeyboardEvent(None, 53, key_down)  # Escape
+            cmd_enter_events = []
+            for key_down in (True, False):
+                event = CGEventCreateKeyboardEvent(None, 36, key_down)  # Enter
+                CGEventSetFlags(event, kCGEventFlagMaskCommand)
+                cmd_enter_events.append(event)
+            self._cmd_enter_events = tuple(cmd_enter_events)
+        # 次の発話用に標準入力待ちのsayを先行起動しておく
+        self._say = self._spawn_say()
         if VOICE_RECOGNITION_AVAILABLE:
             try:
-                self.whisper_model = WhisperModel("tiny", device="cpu")
+                self.whisper_model = _get_whisper()
+                # VADで無音区間をエンコーダに通さないバッチ推論パイプライン
+                self.pipe = BatchedInferencePipeline(model=self.whisper_model)
                 logger.info("Whisper model loaded")
+                # 起動メッセージの表示中に初回推論の初期化コストを済ませる
+                threading.Thread(target=self._warmup_whisper, daemon=True).start()
             except Exception as e:
                 logger.error(f"Failed to load Whisper: {e}")
     
+    def _warmup_whisper(self) -> None:
+        """無音1秒でダミー推論し、初回の文字起こしの初期化コストを先に払う"""
+        try:
+            silence = np.zeros(16000, dtype=np.float32)
+            # VADを通すと無音はエンコーダに届かないため、モデルを直接1回実行する
+            segments, _ = self.whisper_model.transcribe(silence, language="ja", beam_size=1)
+            for _ in segments:
+                pass
+            # VADモデルの読み込みもここで済ませる
+            segments, _ = self.pipe.transcribe(silence, vad_filter=True, **_FAST_KW_OPTS)
+            for _ in segments:
+                pass
+        except Exception as e:
+            logger.error(f"Whisper warmup failed: {e}")
+    
+    def _spawn_say(self) -> Optional[subprocess.Popen]:
+        """標準入力から読み上げるsayプロセスを起動"""
+        try:
+            return subprocess.Popen(['say'], stdin=subprocess.PIPE, text=True)
+        except Exception as e:
+            logger.error(f"Failed to spawn say: {e}")
+            return None
+    
     def speak_text(self, text: str) -> None:
-        """テキストを読み上げ"""
+        """テキストを読み上げ（先行起動したsayに流し込み、完了まで待機）"""
+        proc = self._say
+        self._say = None
         try:
             print(f"🔊 読み上げ: {text}")
-            subprocess.run(['say', text], timeout=30, check=False)
+            
+            # 先行起動したsayが使えなければその場で起動
+            if proc is None or proc.poll() is not None:
+                proc = subprocess.Popen(['say'], stdin=subprocess.PIPE, text=True)
+            
+            proc.stdin.write(text)
+            proc.stdin.close()
+            proc.wait(timeout=30)
             print("✅ 読み上げ完了")
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()  # 終了を回収してゾンビを残さない
+            print(f"📝 メッセージ: {text}")
         except Exception as e:
             logger.error(f"Speech failed: {e}")
             print(f"📝 メッセージ: {text}")
+        finally:
+            # 読み上げ後の録音・キー操作の間に次のsayを起動しておく
+            self._say = self._spawn_say()
     
-    def record_audio_macos(self, duration: int = 4) -> Optional[str]:
-        """macOSで音声録音（要件1: 4秒に変更）"""
+    def record_audio_macos(self, duration: int = 4) -> Optional["np.ndarray"]:
+        """macOSで音声録音（要件1: 4秒に変更）- 16kHzモノラルのfloat32配列を返す"""
+        if not VOICE_RECOGNITION_AVAILABLE:
+            return None
+        
         try:
-            temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            temp_file.close()
-            
-            cmd = ['rec', temp_file.name, 'trim', '0', str(duration)]
+            SAMPLE_RATE = 16000
+            
+            if SOUNDDEVICE_AVAILABLE:
+                # プロセス起動・一時ファイルなしでメモリ上に録音
+                audio = sd.rec(int(duration * SAMPLE_RATE), samplerate=SAMPLE_RATE,
+                               channels=1, dtype='float32')
+                sd.wait()
+                return audio.reshape(-1)
+            
+            # -q: 進捗メーターをstderrに書き出さない
+            # 一時ファイルを介さず、16bit PCMを標準出力で直接受け取る
+            cmd = [
+                'rec', '-q', '-t', 'raw', '-r', str(SAMPLE_RATE), '-b', '16', '-c', '1',
+                '-e', 'signed-integer', '-', 'trim', '0', str(duration)
+            ]
             
             try:
-                subprocess.run(cmd, check=True, capture_output=True)
-                return temp_file.name
-            except subprocess.CalledProcessError:
+                result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except subprocess.CalledProcessError as e:
+                logger.error(f"rec failed: {e.stderr.decode(errors='replace').strip()}")
                 return None
+            
+            pcm = np.frombuffer(result.stdout, dtype=np.int16)
+            return pcm.astype(np.float32) / 32768.0
                 
         except Exception as e:
             logger.error(f"Recording failed: {e}")
             return None
     
-    def transcribe_audio(self, audio_file: str) -> Optional[str]:
-        """音声をテキストに変換"""
+    def transcribe_audio(self, audio: "np.ndarray") -> Optional[str]:
+        """録音した音声（float32配列）をテキストに変換"""
         try:
-            if not self.whisper_model or not audio_file:
+            if not self.pipe or audio is None or audio.size == 0:
                 return None
             
-            segments, _ = self.whisper_model.transcribe(audio_file, language="ja")
+            # 無音のみの録音はVADで発話区間なしとなり、デコードされない
+            segments, _ = self.pipe.transcribe(
+                audio, vad_filter=True, vad_parameters=dict(min_silence_duration_ms=300),
+                **_FAST_KW_OPTS
+            )
             text = " ".join([segment.text for segment in segments])
             
-            # 一時ファイル削除
-            os.unlink(audio_file)
-            
             return text.strip()
             
         except Exception as e:
@@ -121,6 +259,13 @@ class VoiceBot:
     
 
     
+    def _key_event(self, keycode: int, key_down: bool):
+        """生成済みのキーイベントを返す（未登録のキーはその場で生成）"""
+        event = self._kevents.get((keycode, key_down))
+        if event is None:
+            event = CGEventCreateKeyboardEvent(None, keycode, key_down)
+        return event
+    
     def press_key_quartz(self, keycode: int) -> bool:
         """Quartzでキーを送信"""
         if not QUARTZ_AVAILABLE:
@@ -128,13 +273,11 @@ class VoiceBot:
         
         try:
             # Key down
-            event = CGEventCreateKeyboardEvent(None, keycode, True)
-            CGEventPost(kCGHIDEventTap, event)
+            CGEventPost(kCGHIDEventTap, self._key_event(keycode, True))
             time.sleep(0.05)
             
             # Key up
-            event = CGEventCreateKeyboardEvent(None, keycode, False)
-            CGEventPost(kCGHIDEventTap, event)
+            CGEventPost(kCGHIDEventTap, self._key_event(keycode, False))
             
             return True
         except Exception as e:
@@ -152,14 +295,17 @@ class VoiceBot:
             
             print("🎤 音声入力①を開始しています...")
             
-            # 1回目
-            if not self.press_key_quartz(RIGHT_COMMAND_KEY):
-                return False
-            time.sleep(0.1)
-            
-            # 2回目
-            if not self.press_key_quartz(RIGHT_COMMAND_KEY):
-                return False
+            # down/up/down/up の4イベントを毎回新しく生成し、続けて送信する
+            # （同じイベントを使い回すと起動時のタイムスタンプのまま送られる）
+            events = [
+                CGEventCreateKeyboardEvent(None, RIGHT_COMMAND_KEY, key_down)
+                for key_down in (True, False, True, False)
+            ]
+            # 押下保持5ms、タップ間隔30ms（ダブルタップ判定 <300ms に収まる）
+            for event, delay in zip(events, (0.005, 0.03, 0.005, 0)):
+                CGEventPost(kCGHIDEventTap, event)
+                if delay:
+                    time.sleep(delay)
             
             print("✅ 音声入力①が開始されました")
             return True
@@ -188,29 +334,137 @@ class VoiceBot:
             logger.error(f"Failed to stop dictation: {e}")
             return False
     
+    def _start_mic_stream(self, chunks: "queue.Queue", chunk_seconds: int = 1):
+        """マイク入力をchunk_seconds秒ごとのfloat32配列としてchunksへ送り続ける（停止用の関数を返す）
+        
+        録音が途中で終了した場合はchunksにNoneを送る。開始に失敗した場合は例外を送出する。
+        """
+        SAMPLE_RATE = 16000
+        
+        if SOUNDDEVICE_AVAILABLE:
+            # PortAudioのコールバックスレッドから1秒分ずつキューへ渡す
+            def callback(indata, frames, time_info, status):
+                chunks.put(indata[:, 0].copy())
+            
+            stream = sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype='float32',
+                                    blocksize=SAMPLE_RATE * chunk_seconds, callback=callback,
+                                    finished_callback=lambda: chunks.put(None))
+            try:
+                stream.start()
+            except Exception:
+                stream.close()
+                raise
+            return stream.close
+        
+        # recを1本だけ起動し、16bit PCMを標準出力から読み続ける
+        cmd = [
+            'rec', '-q', '-t', 'raw', '-r', str(SAMPLE_RATE), '-b', '16', '-c', '1',
+            '-e', 'signed-integer', '-'
+        ]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        
+        def reader():
+            CHUNK_BYTES = SAMPLE_RATE * chunk_seconds * 2
+            while True:
+                data = proc.stdout.read(CHUNK_BYTES)
+                if len(data) < CHUNK_BYTES:
+                    break
+                chunks.put(np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0)
+            # 終了を監視側に知らせる
+            chunks.put(None)
+        
+        def log_stderr():
+            # recのエラー出力をログへ流す（パイプを詰まらせない）
+            for line in proc.stderr:
+                logger.warning(f"rec: {line.decode(errors='replace').rstrip()}")
+        
+        threading.Thread(target=reader, daemon=True).start()
+        threading.Thread(target=log_stderr, daemon=True).start()
+        
+        def stop():
+            proc.terminate()
+            proc.wait()
+        return stop
+    
     def background_voice_monitor(self):
-        """要件4: バックグラウンドで音声入力②を監視"""
+        """要件4: バックグラウンドで音声入力②を監視（録音と文字起こしを並行）"""
         print("🎧 バックグラウンド音声監視を開始...")
         
-        while not self.stop_monitoring:
-            try:
-                # 音声録音（短い間隔で監視）
-                audio_file = self.record_audio_macos(duration=5)
-                if audio_file:
-                    text = self.transcribe_audio(audio_file)
-                    if text:
-                        # 「音声入力終了」を検知
-                        if '音声入力終わり' in text or '終わり' in text:
-                            print("🎯 音声入力終わりを検知！")
-                            self.stop_monitoring = True
-                            self.stop_dictation()
-                            break
+        if not self.pipe:
+            # 音声認識が使えない場合は外部から停止されるまで待機
+            print("❌ 音声認識が利用できません")
+            self._stop_evt.wait()
+            return
+        
+        WINDOW_CHUNKS = 3  # 直近3秒分をまとめて文字起こし
+        SILENCE_PEAK = 0.01  # 窓全体の振幅がこれ未満なら無音とみなす
+        MAX_RETRY_DELAY = 30  # 録音再開の待機上限（秒）
+        
+        window = collections.deque(maxlen=WINDOW_CHUNKS)
+        stop_stream = None
+        retry_delay = 1
+        
+        try:
+            while not self._stop_evt.is_set():
+                if stop_stream is None:
+                    # 録音は別スレッドで途切れなく続け、こちらは文字起こしだけを行う
+                    # （開始に失敗しても監視は終えず、間隔を延ばしながら再試行する）
+                    chunks = queue.Queue()
+                    try:
+                        stop_stream = self._start_mic_stream(chunks)
+                    except Exception as e:
+                        logger.error(f"Failed to start microphone capture: {e}")
+                        print(f"⚠️ マイク録音を開始できません。{retry_delay}秒後に再試行します")
+                        self._stop_evt.wait(retry_delay)
+                        retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                        continue
                 
-                time.sleep(1)  # 短い間隔で再チェック
+                try:
+                    chunk = chunks.get(timeout=1)
+                except queue.Empty:
+                    continue
+                # 文字起こし中に溜まった分をまとめて取り込む
+                ended = chunk is None
+                if not ended:
+                    window.append(chunk)
+                while not ended and not chunks.empty():
+                    chunk = chunks.get_nowait()
+                    if chunk is None:
+                        ended = True
+                    else:
+                        window.append(chunk)
                 
-            except Exception as e:
-                logger.error(f"Background monitoring error: {e}")
-                break
+                if ended:
+                    # 録音が途中で止まった場合は後始末して再開する
+                    logger.error("Microphone capture stopped unexpectedly")
+                    print(f"⚠️ マイク録音が停止しました。{retry_delay}秒後に再開します")
+                    stop_stream()
+                    stop_stream = None
+                    self._stop_evt.wait(retry_delay)
+                    retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                    continue
+                retry_delay = 1
+                
+                audio = np.concatenate(window)
+                # 無音の窓はVAD・Whisperに渡さず、次のチャンクを待つ
+                if np.abs(audio).max() < SILENCE_PEAK:
+                    continue
+                
+                text = self.transcribe_audio(audio)
+                if text:
+                    # 「音声入力終了」を検知
+                    if '音声入力終わり' in text or '終わり' in text:
+                        print("🎯 音声入力終わりを検知！")
+                        self._end_detected = True
+                        self._stop_evt.set()
+                        self.stop_dictation()
+                        break
+                
+        except Exception as e:
+            logger.error(f"Background monitoring error: {e}")
+        finally:
+            if stop_stream:
+                stop_stream()
         
         print("🛑 バックグラウンド音声監視を終了")
     
@@ -223,20 +477,11 @@ class VoiceBot:
             return False
         
         try:
-            CMD_KEY = 55     # Left Command
-            ENTER_KEY = 36   # Enter
-            
             print("📤 Cmd+Enterで送信中...")
             
-            # Cmd+Enter
-            event = CGEventCreateKeyboardEvent(None, CMD_KEY, True)
-            CGEventPost(kCGHIDEventTap, event)
-            event = CGEventCreateKeyboardEvent(None, ENTER_KEY, True)
-            CGEventPost(kCGHIDEventTap, event)
-            event = CGEventCreateKeyboardEvent(None, ENTER_KEY, False)
-            CGEventPost(kCGHIDEventTap, event)
-            event = CGEventCreateKeyboardEvent(None, CMD_KEY, False)
-            CGEventPost(kCGHIDEventTap, event)
+            # Cmd+Enter（Commandフラグ付きのEnterイベントを起動時に生成済み）
+            for event in self._cmd_enter_events:
+                CGEventPost(kCGHIDEventTap, event)
             
             print("✅ 送信完了")
             return True
@@ -246,7 +491,11 @@ class VoiceBot:
             return False
     
     def handle_post_send_screenshot(self) -> bool:
-        """送信後の確認処理（スクロール・ボタンクリック実行）"""
+        """送信後の確認処理（スクロール・ボタンクリック実行）
+        
+        Returns:
+            次のサイクルに進む場合True、処理を終了する場合False
+        """
         try:
             print("\n【ステップ8】ChatGPT出力確認")
             
@@ -275,10 +524,10 @@ class VoiceBot:
                         print("🛑 マイクを確実に停止しています...")
                         self.stop_dictation()
                         
-                        # 最初のステップに戻る
+                        # 最初のステップに戻る（再帰せず、main()のループで再開する）
+                        # 「お話しください」の読み上げ完了を待ってから音声入力を開始するため固定待機は不要
                         print("\n🔄 次の音声入力に戻ります...")
-                        time.sleep(2)  # 少し待機
-                        return self.run_requirements_1_to_3()  # 最初から再開
+                        return True
                     else:
                         print("❌ 音声確認がキャンセルされました - 処理を終了します")
                         return False
@@ -294,8 +543,11 @@ class VoiceBot:
             print("❌ 確認処理中にエラーが発生しました")
             return False
     
-    def run_requirements_1_to_3(self):
-        """メインワークフロー（簡略化版）- 初期確認なし"""
+    def run_requirements_1_to_3(self) -> bool:
+        """メインワークフロー（簡略化版）- 初期確認なし
+        
+        ステップ1〜11を1サイクル実行し、次のサイクルに進む場合はTrueを返す
+        """
         print("\n" + "="*50)
         print("VoiceChatBot - シンプル音声制御")
         print("="*50)
@@ -311,13 +563,14 @@ class VoiceBot:
             print("❌ 音声入力①の開始に失敗しました")
             return False
     
-    def run_requirements_4_to_7(self):
+    def run_requirements_4_to_7(self) -> bool:
         """ステップ4-7を実装（簡略化版）"""
         print("\n【ステップ4-7】音声入力処理と送信")
         
         try:
             # 要件4: バックグラウンドで音声入力②を起動
-            self.stop_monitoring = False
+            self._stop_evt.clear()
+            self._end_detected = False
             self.background_thread = threading.Thread(target=self.background_voice_monitor)
             self.background_thread.daemon = True
             self.background_thread.start()
@@ -328,6 +581,11 @@ class VoiceBot:
             # バックグラウンドスレッドの終了を待機（タイムアウトなし）
             self.background_thread.join()  # タイムアウトを削除
             
+            # 監視がエラーで終了した場合は、入力途中の内容を送信しない
+            if not self._end_detected:
+                print("❌ 音声入力終わりを検知できなかったため送信しません")
+                return False
+            
             # 要件7: Cmd+Enterで送信
             print("\n【ステップ7】送信")
             if self.send_with_cmd_enter():
@@ -350,39 +608,16 @@ class VoiceBot:
         
         while True:
             try:
-                temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-                temp_file.close()
+                # 録音失敗・認識失敗時はNoneとなり、再度録音する
+                text = self.transcribe_audio(self.record_audio_macos(duration=5))
                 
-                cmd = ['rec', temp_file.name, 'trim', '0', '5']
-                try:
-                    subprocess.run(cmd, check=True, capture_output=True)
-                    
-                    if self.whisper_model:
-                        segments, _ = self.whisper_model.transcribe(temp_file.name, language="ja")
-                        text = " ".join([segment.text for segment in segments])
-                        os.unlink(temp_file.name)
-                        
-                        if text:
-                            # 「はい」系の判定
-                            yes_commands = ['はい', 'hai', 'yes', 'うん', 'そうです', 'オッケー', 'ok']
-                            # 終わり系の判定
-                            end_commands = ['終わり', 'おわり', 'オワリ', 'キャンセル', 'cancel', 'いいえ', 'no']
-                            
-                            text_lower = text.lower()
-                            
-                            if any(yes_word in text_lower for yes_word in yes_commands):
-                                print("✅ 「はい」を検知")
-                                return True
-                            elif any(end_word in text_lower for end_word in end_commands):
-                                print("❌ 終了コマンドを検知")
-                                return False
-                
-                except:
-                    # 録音失敗時はファイルを削除
-                    try:
-                        os.unlink(temp_file.name)
-                    except:
-                        pass
+                if text:
+                    if _YES_RE.search(text):
+                        print("✅ 「はい」を検知")
+                        return True
+                    elif _END_RE.search(text):
+                        print("❌ 終了コマンドを検知")
+                        return False
                 
                 time.sleep(1)
                 
@@ -395,17 +630,16 @@ class VoiceBot:
     
     def scroll_screen(self) -> bool:
         """PyAutoGUIで一気に大きくスクロール"""
+        if not PYAUTOGUI_AVAILABLE:
+            print("❌ PyAutoGUIが利用できません。手動でスクロールしてください")
+            return False
+        
         try:
-            try:
-                import pyautogui
-            except ImportError:
-                print("❌ PyAutoGUIが利用できません。手動でスクロールしてください")
-                return False
-            
             print("📜 PyAutoGUIで一気に大きくスクロール中...")
             
             # 一気に大きくスクロール（下方向）
             pyautogui.scroll(-10000)  # 一気に大きくスクロール
+            time.sleep(0.1)  # 直後のボタン検索のためにスクロールの描画を待つ
             
             print("✅ 画面スクロール完了")
             return True
@@ -418,51 +652,85 @@ class VoiceBot:
 
     def find_and_click_image_simple(self, button_image: str = "startVoiceBtn.png") -> bool:
         """PyAutoGUIを使用したシンプルな画像検索・クリック（複数ボタン対応・座標補正廃止）"""
+        if not PYAUTOGUI_AVAILABLE:
+            print("❌ PyAutoGUIが利用できません。pip install pyautoguiでインストールしてください")
+            return False
+        
+        debug = DEBUG_MODE or logger.isEnabledFor(logging.DEBUG)
         try:
-            try:
-                import pyautogui
-            except ImportError:
-                print("❌ PyAutoGUIが利用できません。pip install pyautoguiでインストールしてください")
-                return False
-            
             print(f"🔍 PyAutoGUIで{button_image}を全画面検索中...")
             
             # スクリプトディレクトリからボタン画像のパスを取得
             script_dir = os.path.dirname(os.path.abspath(__file__))
             button_path = os.path.join(script_dir, button_image)
             
-            print(f"🔍 ボタン画像パス: {button_path}")
-            print(f"🔍 ファイルが存在するか: {os.path.exists(button_path)}")
+            if debug:
+                print(f"🔍 ボタン画像パス: {button_path}")
             
             if not os.path.exists(button_path):
                 print(f"❌ ボタン画像 {button_image} が見つかりません")
                 print("💡 startVoiceBtn.pngファイルを作業ディレクトリに配置してください")
                 return False
             
-            # デバッグ: スクリーンショットを取得して保存
             screenshot = pyautogui.screenshot()
-            print(f"🔍 スクリーンショットサイズ: {screenshot.size}")
             
-            # デバッグ用にスクリーンショットを保存
-            debug_screenshot_path = os.path.join(script_dir, "debug_screenshot.png")
-            screenshot.save(debug_screenshot_path)
-            print(f"🔍 デバッグ用スクリーンショット保存: {debug_screenshot_path}")
+            # デバッグ時のみスクリーンショットを保存（Retina全画面のPNGエンコードは重い）
+            if debug:
+                print(f"🔍 スクリーンショットサイズ: {screenshot.size}")
+                debug_screenshot_path = os.path.join(script_dir, "debug_screenshot.png")
+                screenshot.save(debug_screenshot_path)
+                print(f"🔍 デバッグ用スクリーンショット保存: {debug_screenshot_path}")
+            
+            # ボタン画像は初回のみデコードして使い回す
+            template = self._button_templates.get(button_path)
+            if template is None:
+                with Image.open(button_path) as img:
+                    template = img.copy()
+                self._button_templates[button_path] = template
+            
+            # top=860未満（画面座標、スクリーンショット上は2倍）のボタンだけが対象のため、
+            # その範囲に収まる上部領域だけを検索する（原点は変わらないので座標変換不要）
+            MAX_TOP = 860
+            search_height = min(screenshot.height, MAX_TOP * 2 + template.height)
+            search_area = screenshot.crop((0, 0, screenshot.width, search_height))
             
             # 画像を画面上で検索（全て検索） - 複数の信頼度で試行
+            # 信頼度ごとに撮り直さず、取得済みのスクリーンショットを検索する
             confidence_levels = [0.8, 0.6, 0.4, 0.3]
             locations = []
             
+            # OpenCVがあれば一致度マップを1回だけ計算し、各信頼度はしきい値処理のみ行う
+            MAX_MATCHES = 10000  # locateAllの既定の上限と同じ
+            scores = None
+            if CV2_AVAILABLE:
+                scores = cv2.matchTemplate(
+                    np.asarray(search_area.convert('RGB')),
+                    np.asarray(template.convert('RGB')),
+                    cv2.TM_CCOEFF_NORMED
+                )
+                # テンプレートサイズ内の近傍で最大の点だけを残す
+                # （1つのボタンの周囲に重複した一致が大量に出るのを防ぐ）
+                kernel = np.ones((template.height, template.width), np.uint8)
+                peaks = scores == cv2.dilate(scores, kernel)
+            
             for confidence in confidence_levels:
                 try:
-                    print(f"🔍 信頼度 {confidence} で検索中...")
-                    locations = list(pyautogui.locateAllOnScreen(button_path, confidence=confidence))
+                    if debug:
+                        print(f"🔍 信頼度 {confidence} で検索中...")
+                    if scores is not None:
+                        ys, xs = np.nonzero(peaks & (scores >= confidence))
+                        locations = [
+                            Box(int(x), int(y), template.width, template.height)
+                            for x, y in zip(xs[:MAX_MATCHES], ys[:MAX_MATCHES])
+                        ]
+                    else:
+                        locations = list(pyautogui.locateAll(template, search_area, confidence=confidence))
                     if locations:
                         print(f"🔍 信頼度 {confidence} で {len(locations)}個のボタンを発見")
                         break
-                    else:
+                    elif debug:
                         print(f"🔍 信頼度 {confidence} では見つかりませんでした")
                 except pyautogui.ImageNotFoundException:
-                    print(f"🔍 信頼度 {confidence} で画像が見つかりませんでした")
                     continue
                 except Exception as search_error:
                     print(f"❌ 信頼度 {confidence} で検索エラー: {search_error}")
@@ -470,7 +738,10 @@ class VoiceBot:
             
             if not locations:
                 print(f"❌ 全ての信頼度で {button_image} が見つかりませんでした")
-                print("💡 debug_screenshot.pngと比較して、startVoiceBtn.pngが正しいか確認してください")
+                if debug:
+                    print("💡 debug_screenshot.pngと比較して、startVoiceBtn.pngが正しいか確認してください")
+                else:
+                    print("💡 VBOT_DEBUG=1で実行するとdebug_screenshot.pngが保存されます")
                 return False
             
             # 各ボタンの座標を1/2に調整
@@ -489,7 +760,7 @@ class VoiceBot:
             # top=860未満のボタンを選択（画面上部のボタン）
             filtered_locations = []
             for loc in locations:
-                if loc.top < 860:
+                if loc.top < MAX_TOP:
                     filtered_locations.append(loc)
                 else:
                     print(f"🚫 除外: top={loc.top} (860以上のため除外)")
@@ -546,8 +817,9 @@ def main():
     bot = VoiceBot()
     
     try:
-        # 無限ループ開始
-        bot.run_requirements_1_to_3()
+        # 無限ループ開始（サイクルごとにスタックとローカル変数を解放する）
+        while bot.run_requirements_1_to_3():
+            pass
     except KeyboardInterrupt:
         print("\n🛑 プログラムを終了します")
     except Exception as e: